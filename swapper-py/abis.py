@@ -2,6 +2,16 @@
 ABI definitions for Uniswap V4 and related contracts
 """
 
+from eth_utils import function_abi_to_4byte_selector
+
+# Resolve the keccak backend up front so a missing C backend fails here with a clear fix,
+# instead of surfacing from deep inside the selector precomputation below
+try:
+    from eth_hash.auto import keccak
+    keccak(b'')
+except ImportError as e:
+    raise ImportError("No keccak-256 backend available for eth-hash; pip install pycryptodome") from e
+
 POOL_MANAGER_ABI = [
     {
         "inputs": [
@@ -54,3 +64,39 @@ ERC20_ABI = [
     {"constant": True, "inputs": [], "name": "symbol", "outputs": [{"name": "", "type": "string"}], "type": "function"},
     {"constant": True, "inputs": [], "name": "name", "outputs": [{"name": "", "type": "string"}], "type": "function"}
 ]
+
+# Multicall3: only the calls used to read balances in one eth_call
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {"name": "calls", "type": "tuple[]", "components": [
+                {"name": "target", "type": "address"},
+                {"name": "allowFailure", "type": "bool"},
+                {"name": "callData", "type": "bytes"}
+            ]}
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {"name": "returnData", "type": "tuple[]", "components": [
+                {"name": "success", "type": "bool"},
+                {"name": "returnData", "type": "bytes"}
+            ]}
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "addr", "type": "address"}],
+        "name": "getEthBalance",
+        "outputs": [{"name": "balance", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+# Frozen once at import so contract construction and raw calls never rehash signatures
+ERC20_ABI = tuple(ERC20_ABI)
+MULTICALL3_ABI = tuple(MULTICALL3_ABI)
+ERC20_SELECTORS = {item['name']: function_abi_to_4byte_selector(item) for item in ERC20_ABI if item.get('type') == 'function'}
+POOL_MANAGER_SELECTORS = {item['name']: function_abi_to_4byte_selector(item) for item in POOL_MANAGER_ABI if item.get('type') == 'function'}
+MULTICALL3_SELECTORS = {item['name']: function_abi_to_4byte_selector(item) for item in MULTICALL3_ABI if item.get('type') == 'function'}
@@ -0,0 +1,280 @@
+"""
+Uniswap Universal Router Swapper - asyncio variant for Base Network V4
+
+Independent RPC reads (fee history, chain id, balances) are issued
+concurrently with asyncio.gather instead of one after another, and
+concurrent swaps on one instance draw nonces from a shared locked counter.
+"""
+
+import asyncio
+import contextlib
+import time
+import aiohttp
+from web3 import AsyncWeb3
+from web3.exceptions import ContractLogicError, Web3RPCError
+from config import load_config
+from receipts import async_poll_for_receipt, wait_for_receipt_ws
+from units import USDC_UNIT, WEI_PER_ETH
+from uniswap_swapper import (
+    DEFAULT_GAS_LIMITS, ESTIMATE_GAS_FIELDS, FEE_CACHE_TTL, FEE_HISTORY_BLOCKS, FEE_HISTORY_PERCENTILES,
+    SwapperBase, balance_calls, decode_uint_results, eip1559_fees, print_balances
+)
+
+class AsyncUniversalRouterSwapper(SwapperBase):
+    def __init__(self, config=None):
+        config = config or load_config()
+
+        # Same eth_chainId request caching as PooledHTTPProvider (see providers.py)
+        super().__init__(config, AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(config.rpc_url, cache_allowed_requests=True)))
+        # Created in connect(): aiohttp sessions must be opened inside the running event loop
+        self._session = None
+
+        # Fetched on first use unless configured; the chain id never changes for a connection
+        self.chain_id = config.chain_id
+
+        # Next nonce to use: looked up on first use, then counted locally; call resync_nonce() after a failed send.
+        # Concurrent swaps take nonces under the lock, and a resync waits until no swap still holds
+        # nonces it has taken but not yet sent (see _nonce_scope)
+        self._nonce = None
+        self._nonce_lock = asyncio.Lock()
+        self._nonce_scopes = 0
+        self._nonce_stale = False
+
+    async def connect(self):
+        """Open one keep-alive aiohttp session with a large connection pool and hand it to the provider"""
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=100, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector)
+            await self.w3.provider.cache_async_session(self._session)
+        return self
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def get_balance(self, token_address=None):
+        if token_address is None:
+            return await self.w3.eth.get_balance(self.account.address)
+        return await self._erc20(token_address).functions.balanceOf(self.account.address).call()
+
+    async def check_allowance(self, token_address, spender):
+        return await self._erc20(token_address).functions.allowance(self.account.address, spender).call()
+
+    async def get_balances(self):
+        """
+        Return (eth_balance_wei, usdc_balance, usdc_allowance_for_router) from one Multicall3 eth_call,
+        so all three are read from the same block
+        """
+        calls = balance_calls(self.account.address, self.usdc_address, self.universal_router_address)
+        eth_balance, usdc_balance, usdc_allowance = decode_uint_results(
+            await self.multicall.functions.aggregate3(calls).call()
+        )
+        return eth_balance, usdc_balance, usdc_allowance
+
+    async def _get_chain_id(self):
+        if self.chain_id is None:
+            self.chain_id = await self.w3.eth.chain_id
+        return self.chain_id
+
+    async def _load_nonce(self):
+        # Caller holds _nonce_lock
+        self._nonce = await self.w3.eth.get_transaction_count(self.account.address, 'pending')
+        self._nonce_stale = False
+
+    @contextlib.asynccontextmanager
+    async def _nonce_scope(self):
+        """Wrap taking nonces with _next_nonce() through sending them; deferred resyncs run when the last scope exits"""
+        self._nonce_scopes += 1
+        try:
+            yield
+        finally:
+            async with self._nonce_lock:
+                self._nonce_scopes -= 1
+                if self._nonce_stale and self._nonce_scopes == 0:
+                    await self._load_nonce()
+
+    async def _next_nonce(self, count=1):
+        """Take the next `count` consecutive nonces, returning the first"""
+        async with self._nonce_lock:
+            if self._nonce is None:
+                await self._load_nonce()
+            nonce = self._nonce
+            self._nonce += count
+            return nonce
+
+    async def resync_nonce(self):
+        """
+        Reload the local nonce counter from the node's pending transaction count; while other swaps
+        still hold unsent nonces the reload is deferred until the last of them finishes
+        """
+        async with self._nonce_lock:
+            self._nonce_stale = True
+            if self._nonce_scopes == 0:
+                await self._load_nonce()
+
+    async def _get_fees(self):
+        """EIP-1559 fee fields, reused for FEE_CACHE_TTL seconds"""
+        if self._fee_cache is None or time.monotonic() >= self._fee_cache[1]:
+            fee_history = await self.w3.eth.fee_history(FEE_HISTORY_BLOCKS, 'latest', FEE_HISTORY_PERCENTILES)
+            self._fee_cache = (eip1559_fees(fee_history), time.monotonic() + FEE_CACHE_TTL)
+        return self._fee_cache[0]
+
+    async def _gas_limit(self, path, trx=None):
+        """Gas limit for a path: estimated once and cached with GAS_LIMIT_MARGIN_PCT headroom"""
+        limit = self._gas_cache.get(path)
+        if limit is None and trx is not None:
+            try:
+                estimate = await self.w3.eth.estimate_gas({k: trx[k] for k in ESTIMATE_GAS_FIELDS})
+            except (ContractLogicError, Web3RPCError):
+                return DEFAULT_GAS_LIMITS[path]
+            limit = self._store_gas_estimate(path, estimate)
+        return DEFAULT_GAS_LIMITS[path] if limit is None else limit
+
+    async def _build_router_transaction(self, data, value, nonce, fees, gas_path, estimate_gas=True):
+        """Assemble a Universal Router execute() transaction from already-fetched fields"""
+        trx = self._transaction(self.universal_router_address, value, data, nonce, fees)
+        trx['gas'] = await self._gas_limit(gas_path, trx if estimate_gas else None)
+        return trx
+
+    async def _send(self, trx):
+        return await self._send_signed(self.account.sign_transaction(trx))
+
+    async def _send_signed(self, signed):
+        return await self.w3.eth.send_raw_transaction(signed.raw_transaction)
+
+    async def swap_eth_to_usdc(self, eth_amount_wei, simulate=False):
+        """
+        Swap ETH to USDC using Universal Router V4 builder
+
+        :param eth_amount_wei: Amount of ETH to swap (in wei)
+        :param simulate: Dry-run the transaction with eth_call before sending (one extra RPC)
+        """
+        addr = self.account.address
+        fees, chain_id, balance = await asyncio.gather(
+            self._get_fees(),
+            self._get_chain_id(),
+            self.w3.eth.get_balance(addr)
+        )
+        print(f"🔍 Network: Base ({chain_id})")
+        print(f"🔍 Amount: {eth_amount_wei / WEI_PER_ETH} ETH")
+
+        gas_buffer = 3 * WEI_PER_ETH // 10_000  # 0.0003 ETH
+        if balance < eth_amount_wei + gas_buffer:
+            raise ValueError("Insufficient ETH balance")
+
+        # ~4650 USDC per ETH pool ratio, 5% slippage
+        eth_amount_ether = eth_amount_wei / WEI_PER_ETH
+        estimated_usdc = eth_amount_ether * 4650
+        min_usdc_out = eth_amount_wei * 4650 * 95 * USDC_UNIT // (100 * WEI_PER_ETH)
+
+        print(f"📊 Estimated USDC out: {estimated_usdc:.4f}")
+        print(f"📊 Minimum USDC (5% slippage): {min_usdc_out / USDC_UNIT:.4f}")
+
+        data = self._swap_calldata.build(
+            True,  # ETH -> USDC
+            eth_amount_wei,
+            max(min_usdc_out, 100000)  # At least 0.1 USDC
+        )
+
+        async with self._nonce_scope():
+            try:
+                trx = await self._build_router_transaction(data, eth_amount_wei, await self._next_nonce(), fees, 'eth_to_usdc')
+
+                if simulate:
+                    print("🔄 Simulating transaction...")
+                    await self.w3.eth.call(trx, 'pending')
+                    print("✅ Simulation passed!")
+
+                tx_hash = await self._send(trx)
+            except Exception as e:
+                print(f"❌ Error: {e}")
+                await self.resync_nonce()
+                return None
+
+        print(f"📤 Transaction sent: {tx_hash.hex()}")
+        print("⏳ Waiting for confirmation...")
+
+        try:
+            receipt = await self.wait_for_transaction(tx_hash, timeout=120)
+            if receipt.status == 1:
+                print(f"✅ SUCCESS! Gas used: {receipt.gasUsed}")
+                return tx_hash
+            else:
+                print("❌ Transaction failed on-chain")
+                return None
+
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return None
+
+    async def swap_usdc_to_eth(self, usdc_amount):
+        """
+        Swap USDC to ETH using Universal Router V4 builder (v4_swap -> swap_exact_in_single)
+
+        :param usdc_amount: Amount of USDC to swap (in smallest units)
+        """
+        usdc_balance, usdc_allowance, fees, _ = await asyncio.gather(
+            self.get_balance(self.usdc_address),
+            self.check_allowance(self.usdc_address, self.universal_router_address),
+            self._get_fees(),
+            self._get_chain_id()
+        )
+
+        if usdc_balance < usdc_amount:
+            raise ValueError("Insufficient USDC balance")
+
+        # Approve Universal Router to spend USDC, unless an earlier unlimited approve still covers it
+        needs_approve = usdc_allowance < usdc_amount
+        signed_approve_tx = None
+        async with self._nonce_scope():
+            # From _next_nonce() to the last send, any failure may leave a taken nonce unsent
+            try:
+                # Taken together so no concurrent swap can slip in between the approve and the swap
+                nonce = await self._next_nonce(2 if needs_approve else 1)
+                if needs_approve:
+                    approve_tx = self._approve_transaction(nonce, fees)
+                    approve_tx['gas'] = await self._gas_limit('approve', approve_tx)
+                    signed_approve_tx = self.account.sign_transaction(approve_tx)
+                    nonce += 1
+
+                trx = await self._build_router_transaction(
+                    self._swap_calldata.build(False, usdc_amount, 0), 0, nonce, fees,
+                    'usdc_to_eth', estimate_gas=not needs_approve
+                )
+                return await self._send_after_approve(signed_approve_tx, self.account.sign_transaction(trx))
+            except Exception:
+                await self.resync_nonce()
+                raise
+
+    async def _send_after_approve(self, signed_approve_tx, signed):
+        """
+        Broadcast an optional approve and the swap back-to-back; consecutive nonces keep them
+        ordered without waiting a block. Returns the swap hash.
+        """
+        approve_tx_hash = None
+        try:
+            if signed_approve_tx is not None:
+                approve_tx_hash = await self._send_signed(signed_approve_tx)
+            return await self._send_signed(signed)
+        except Web3RPCError as e:
+            if approve_tx_hash is None or 'nonce too high' not in str(e).lower():
+                raise
+            # Node refused to queue the swap behind the pending approve: fall back to waiting for it
+            await self.wait_for_transaction(approve_tx_hash)
+            return await self._send_signed(signed)
+
+    async def wait_for_transaction(self, tx_hash, timeout=300, poll_interval=3.0):
+        """Wait for transaction confirmation (raises TimeExhausted on timeout)"""
+        if self.config.ws_url:
+            return await wait_for_receipt_ws(self.config.ws_url, tx_hash, timeout)
+        return await async_poll_for_receipt(self.w3, tx_hash, timeout=timeout, poll_interval=poll_interval)
+
+async def display_balances(swapper):
+    print_balances(*await swapper.get_balances())
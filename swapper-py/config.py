@@ -0,0 +1,48 @@
+"""
+Shared configuration for the Base Network V4 swappers
+"""
+
+import functools
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+from dotenv import load_dotenv
+from eth_utils import to_checksum_address
+
+@dataclass(frozen=True)
+class Config:
+    rpc_url: str
+    private_key: str = field(repr=False)
+    router: str
+    usdc: str
+    # Optional CHAIN_ID skips the eth_chainId lookup at startup
+    chain_id: Optional[int] = None
+    # ETH/USDC v4 pool parameters: 0.05% fee, tick spacing 10
+    pool_fee: int = 500
+    tick_spacing: int = 10
+    # Optional WS_URL: wait for receipts on newHeads pushes instead of HTTP polling
+    ws_url: Optional[str] = None
+    # Optional WEB3_POOL_SIZE: keep-alive HTTP connections per RPC host (None keeps the provider default)
+    pool_size: Optional[int] = None
+
+def _require_env(name):
+    value = os.getenv(name)
+    if not value:
+        raise ValueError(f"{name} not found in environment variables")
+    return value
+
+@functools.cache
+def load_config():
+    """Read .env and the environment once per process; addresses are checksummed here and never again"""
+    load_dotenv()
+    chain_id = os.getenv('CHAIN_ID')
+    pool_size = os.getenv('WEB3_POOL_SIZE')
+    return Config(
+        rpc_url=_require_env('RPC_URL'),
+        private_key=_require_env('PRIVATE_KEY'),
+        router=to_checksum_address(_require_env('UNIVERSAL_ROUTER_ADDRESS')),
+        usdc=to_checksum_address(_require_env('USDC_ADDRESS')),
+        chain_id=int(chain_id) if chain_id else None,
+        ws_url=os.getenv('WS_URL') or None,
+        pool_size=int(pool_size) if pool_size else None
+    )
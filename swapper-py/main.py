@@ -2,16 +2,74 @@
 Uniswap Universal Router Swapper - Entry Point for Base Network V4
 """
 
+import argparse
 import sys
-from uniswap_swapper import UniversalRouterSwapper, interactive_swap
+from swapperd import NoResponse, handle_request, send_request
+from units import USDC_UNIT, WEI_PER_ETH, parse_base_units, parse_eth, parse_usdc
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Uniswap Universal Router V4 swapper for Base Network")
+    subparsers = parser.add_subparsers(dest='command')
+
+    subparsers.add_parser('balances', help="Display ETH and USDC balances")
+    for command, token in (('eth_to_usdc', 'ETH'), ('usdc_to_eth', 'USDC')):
+        sub = subparsers.add_parser(command, help=f"Swap {token} (no command starts the interactive menu)")
+        sub.add_argument('amount', help=f"Amount of {token} to swap")
+        sub.add_argument('--amount-wei', action='store_true',
+                         help=f"Treat amount as an integer in {token}'s smallest unit (skips decimal parsing)")
+
+    return parser.parse_args(argv)
+
+def build_request(args):
+    if args.command == 'balances':
+        return {'op': 'balances'}
+    parse = parse_eth if args.command == 'eth_to_usdc' else parse_usdc
+    amount = parse_base_units(args.amount) if args.amount_wei else parse(args.amount)
+    return {'op': args.command, 'amount': amount}
+
+def print_response(response):
+    """Print a command response, returning the process exit code"""
+    if not response['ok']:
+        print(f"❌ Error: {response['error']}")
+        return 1
+    if 'tx_hash' in response:
+        print(f"✅ Swap completed! Transaction: {response['tx_hash']}")
+    else:
+        print(f"ETH Balance: {response['eth_balance'] / WEI_PER_ETH:.4f} ETH")
+        print(f"USDC Balance: {response['usdc_balance'] / USDC_UNIT:.2f} USDC")
+        print(f"USDC Allowance (Universal Router): {response['usdc_allowance'] / USDC_UNIT:.2f} USDC")
+    return 0
 
 def main():
+    args = parse_args()
+
+    if args.command is not None:
+        # A running swapperd already has web3 loaded and the RPC connection warm
+        try:
+            request = build_request(args)
+        except ValueError as e:
+            print(f"❌ Error: {e}")
+            sys.exit(2)
+        try:
+            response = send_request(request)
+        except NoResponse as e:
+            # The daemon has the request, so running it here too could swap twice
+            print(f"❌ Error: swapperd gave no answer ({e}); the command may still complete, check balances before retrying")
+            sys.exit(1)
+        if response is not None:
+            sys.exit(print_response(response))
+
     print("🚀 Starting Uniswap Universal Router Swapper for Base Network V4...")
 
     try:
+        from uniswap_swapper import UniversalRouterSwapper, interactive_swap
+
         swapper = UniversalRouterSwapper()
         print("✅ Connected to Ethereum network")
-        interactive_swap(swapper)
+        if args.command is None:
+            interactive_swap(swapper)
+        else:
+            sys.exit(print_response(handle_request(swapper, request)))
 
     except Exception as e:
         print(f"❌ Error: {str(e)}")
@@ -0,0 +1,51 @@
+"""
+Keep-alive HTTP provider shared by the synchronous swapper
+
+Sessions are per RPC URL and pool size and per process, so create one Web3
+per URL and share it rather than building a new Web3 (and provider) for each
+task.
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from web3 import Web3
+
+# One pooled session per (RPC URL, pool size) for the whole process
+_SESSIONS = {}
+
+# Keep-alive connections kept per RPC host; requests beyond this open throwaway connections
+DEFAULT_POOL_SIZE = 64
+
+def get_pooled_session(endpoint_uri, pool_size=None):
+    pool_size = pool_size or DEFAULT_POOL_SIZE
+    session = _SESSIONS.get((endpoint_uri, pool_size))
+    if session is None:
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=pool_size,
+            # JSON-RPC goes over POST, which urllib3 does not retry unless told to
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.2,
+                status_forcelist=[429, 502, 503, 504],
+                allowed_methods=frozenset(['POST'])
+            )
+        )
+        session = _SESSIONS[(endpoint_uri, pool_size)] = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+    return session
+
+class PooledHTTPProvider(Web3.HTTPProvider):
+    """HTTPProvider whose requests reuse TCP/TLS connections from a process-wide keep-alive session"""
+
+    def __init__(self, endpoint_uri, request_kwargs=None, pool_size=None, **kwargs):
+        # Cache eth_chainId: web3's validation middleware otherwise re-sends it before every eth_call/estimateGas
+        kwargs.setdefault('cache_allowed_requests', True)
+        super().__init__(
+            endpoint_uri,
+            request_kwargs=request_kwargs or {'timeout': 10},
+            session=get_pooled_session(endpoint_uri, pool_size),
+            **kwargs
+        )
@@ -0,0 +1,116 @@
+"""
+Transaction receipt waiting: push-based over a WebSocket newHeads subscription,
+or HTTP polling that backs off when the provider rate-limits (HTTP 429)
+"""
+
+import asyncio
+import time
+import aiohttp
+import requests
+from hexbytes import HexBytes
+from web3 import AsyncWeb3, WebSocketProvider
+from web3.exceptions import TimeExhausted, TransactionNotFound
+
+# Upper bound for the backoff between polls while rate-limited
+MAX_POLL_INTERVAL = 30.0
+
+def _timeout_error(tx_hash, timeout):
+    return TimeExhausted(f"Transaction {HexBytes(tx_hash).hex()} is not in the chain after {timeout} seconds")
+
+def _retry_after(headers):
+    value = headers.get('Retry-After') if headers else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _rate_limit_delay(error):
+    """Seconds to back off for a 429 from the HTTP provider, 0.0 for Retry-After-less 429s, None if not a 429"""
+    if isinstance(error, requests.exceptions.HTTPError):
+        if error.response is None or error.response.status_code != 429:
+            return None
+        return _retry_after(error.response.headers) or 0.0
+    if isinstance(error, requests.exceptions.RetryError):
+        # urllib3 already retried the 429s itself and gave up
+        return 0.0 if '429' in str(error) else None
+    if isinstance(error, aiohttp.ClientResponseError):
+        return (_retry_after(error.headers) or 0.0) if error.status == 429 else None
+    return None
+
+def _next_interval(error, interval, poll_interval):
+    delay = _rate_limit_delay(error)
+    if delay is None:
+        raise error
+    return min(max(delay, interval * 2, poll_interval), MAX_POLL_INTERVAL)
+
+def poll_for_receipt(w3, tx_hash, timeout=300, poll_interval=3.0):
+    """
+    Poll eth_getTransactionReceipt, doubling the interval (up to MAX_POLL_INTERVAL) while rate-limited
+
+    :param w3: Synchronous Web3 instance
+    :param tx_hash: Hash of the transaction to wait for
+    :param timeout: Seconds to wait before raising TimeExhausted
+    :param poll_interval: Seconds between polls when the provider is not throttling
+    """
+    deadline = time.monotonic() + timeout
+    interval = poll_interval
+    while True:
+        try:
+            return w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            interval = poll_interval
+        except (requests.exceptions.HTTPError, requests.exceptions.RetryError) as e:
+            interval = _next_interval(e, interval, poll_interval)
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise _timeout_error(tx_hash, timeout)
+        time.sleep(min(interval, remaining))
+
+async def async_poll_for_receipt(w3, tx_hash, timeout=300, poll_interval=3.0):
+    """AsyncWeb3 counterpart of poll_for_receipt"""
+    deadline = time.monotonic() + timeout
+    interval = poll_interval
+    while True:
+        try:
+            return await w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            interval = poll_interval
+        except aiohttp.ClientResponseError as e:
+            interval = _next_interval(e, interval, poll_interval)
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise _timeout_error(tx_hash, timeout)
+        await asyncio.sleep(min(interval, remaining))
+
+async def _get_receipt(w3, tx_hash):
+    try:
+        return await w3.eth.get_transaction_receipt(tx_hash)
+    except TransactionNotFound:
+        return None
+
+async def wait_for_receipt_ws(ws_url, tx_hash, timeout=300):
+    """
+    Wait for a receipt, looking it up once per new block instead of on a fixed timer
+
+    :param ws_url: WebSocket RPC endpoint supporting eth_subscribe
+    :param tx_hash: Hash of the transaction to wait for
+    :param timeout: Seconds to wait before raising TimeExhausted
+    """
+    async with AsyncWeb3(WebSocketProvider(ws_url)) as w3:
+        async def watch():
+            await w3.eth.subscribe('newHeads')
+            # Subscribe first, then check: the tx may have landed before the subscription existed
+            receipt = await _get_receipt(w3, tx_hash)
+            if receipt is not None:
+                return receipt
+            async for _ in w3.socket.process_subscriptions():
+                receipt = await _get_receipt(w3, tx_hash)
+                if receipt is not None:
+                    return receipt
+
+        try:
+            return await asyncio.wait_for(watch(), timeout)
+        except asyncio.TimeoutError:
+            raise _timeout_error(tx_hash, timeout) from None
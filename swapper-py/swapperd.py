@@ -0,0 +1,137 @@
+"""
+Uniswap Universal Router Swapper - long-running daemon for Base Network V4
+
+Builds one UniversalRouterSwapper (web3 imports, RPC connection, ABI setup)
+and serves CLI commands over a Unix domain socket, so repeated
+`python main.py ...` invocations skip that startup cost. Each request and
+response is a single JSON message on a SOCK_SEQPACKET socket:
+
+    {"op": "balances"}
+    {"op": "eth_to_usdc", "amount": <wei>}
+    {"op": "usdc_to_eth", "amount": <USDC base units>}
+
+Each connection is served on its own thread. Every call through the shared
+swapper (balance reads, building and broadcasting a swap) holds one lock:
+its provider is not thread-safe (batch_requests() switches it into batching
+mode for all threads) and neither is its local nonce counter. Swaps release
+the lock once broadcast and wait for their receipt on a Web3 of their own,
+so balance queries and other swaps are not held up by a confirmation.
+"""
+
+import json
+import os
+import socket
+import threading
+import traceback
+
+SOCKET_PATH = os.getenv('SWAPPER_SOCKET', '/tmp/swapper.sock')
+MAX_MESSAGE_SIZE = 65536
+# A daemon that can't accept within this is treated as absent and the CLI runs the command in-process
+CONNECT_TIMEOUT = 2.0
+# Covers a queued swap plus its receipt wait; past this the command may still complete in the daemon
+RESPONSE_TIMEOUT = 600.0
+
+# Held for every use of the shared swapper's Web3
+_SWAPPER_LOCK = threading.Lock()
+
+def _receipt_web3(swapper):
+    """A Web3 for one thread's receipt polling: shares the pooled HTTP session but not the provider"""
+    from web3 import Web3
+    from providers import PooledHTTPProvider
+
+    return Web3(PooledHTTPProvider(swapper.rpc_url, pool_size=swapper.config.pool_size))
+
+def handle_request(swapper, request):
+    """Run one command against a swapper and return the JSON-serialisable response"""
+    op = request.get('op')
+    if op == 'balances':
+        with _SWAPPER_LOCK:
+            eth_balance, usdc_balance, usdc_allowance = swapper.get_balances()
+        return {'ok': True, 'eth_balance': eth_balance, 'usdc_balance': usdc_balance, 'usdc_allowance': usdc_allowance}
+
+    if op not in ('eth_to_usdc', 'usdc_to_eth'):
+        return {'ok': False, 'error': f"Unknown op: {op}"}
+
+    with _SWAPPER_LOCK:
+        if op == 'eth_to_usdc':
+            tx_hash = swapper.swap_eth_to_usdc(request['amount'], simulate=True, wait=False)
+        else:
+            tx_hash = swapper.swap_usdc_to_eth(request['amount'])
+
+    if tx_hash is None:
+        return {'ok': False, 'error': "Swap failed before it was broadcast"}
+
+    try:
+        receipt = swapper.wait_for_transaction(tx_hash, w3=_receipt_web3(swapper))
+    except Exception as e:
+        # Broadcast already happened, so this must not read as a failure that is safe to retry
+        return {'ok': False, 'tx_hash': tx_hash.hex(),
+                'error': f"Sent {tx_hash.hex()} but no receipt yet ({e}); it may still be mined, check before retrying"}
+    if receipt.status != 1:
+        return {'ok': False, 'tx_hash': tx_hash.hex(), 'error': f"Transaction {tx_hash.hex()} reverted"}
+    return {'ok': True, 'tx_hash': tx_hash.hex()}
+
+class NoResponse(Exception):
+    """The daemon took a request but gave no usable answer; the command may still complete there"""
+
+def send_request(request, path=SOCKET_PATH):
+    """
+    Send a request to a running daemon; returns None when no daemon is listening or accepting
+
+    Raises NoResponse if the daemon took the request but timed out, went away or sent back garbage
+    """
+    try:
+        # SOCK_SEQPACKET on AF_UNIX is missing on macOS (OSError) and AF_UNIX on older Windows (AttributeError)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    except (OSError, AttributeError):
+        return None
+    with sock:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(path)
+            sock.settimeout(RESPONSE_TIMEOUT)
+            sock.send(json.dumps(request).encode())
+        except OSError:
+            return None
+        try:
+            reply = sock.recv(MAX_MESSAGE_SIZE)
+            if not reply:
+                raise NoResponse("connection closed without a reply")
+            return json.loads(reply)
+        except (OSError, ValueError) as e:
+            raise NoResponse(str(e)) from e
+
+def _serve_connection(swapper, conn):
+    with conn:
+        try:
+            response = handle_request(swapper, json.loads(conn.recv(MAX_MESSAGE_SIZE)))
+        except Exception as e:
+            traceback.print_exc()
+            response = {'ok': False, 'error': str(e)}
+        conn.send(json.dumps(response).encode())
+
+def serve(path=SOCKET_PATH):
+    from uniswap_swapper import UniversalRouterSwapper
+
+    swapper = UniversalRouterSwapper()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET) as server:
+        server.bind(path)
+        # Anyone who can connect can spend from the wallet
+        os.chmod(path, 0o600)
+        server.listen()
+        print(f"✅ Listening on {path}")
+
+        try:
+            while True:
+                conn, _ = server.accept()
+                threading.Thread(target=_serve_connection, args=(swapper, conn), daemon=True).start()
+        except KeyboardInterrupt:
+            print("\n👋 Goodbye!")
+        finally:
+            os.unlink(path)
+
+if __name__ == "__main__":
+    serve()
@@ -2,208 +2,486 @@
 Uniswap Universal Router Swapper - Core functionality for Base Network V4
 """
 
-import os
+import asyncio
+import statistics
+import time
 import traceback
 from web3 import Web3
-from web3.middleware import geth_poa_middleware
+from web3.contract.contract import ContractFunction
+from web3.exceptions import ContractLogicError, TimeExhausted, Web3RPCError
+from web3.middleware import ExtraDataToPOAMiddleware
 from eth_account import Account
-from dotenv import load_dotenv
-import time
-from abis import ERC20_ABI
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+from abis import ERC20_ABI, ERC20_SELECTORS, MULTICALL3_ABI, MULTICALL3_SELECTORS
+from config import load_config
+from providers import PooledHTTPProvider
+from receipts import poll_for_receipt, wait_for_receipt_ws
+from units import USDC_UNIT, WEI_PER_ETH, parse_eth, parse_usdc
 from uniswap_universal_router_decoder import RouterCodec
 
-load_dotenv()
+# Native ETH in v4 pool keys, and the "no hooks" address
+ZERO_ADDR = to_checksum_address('0x0000000000000000000000000000000000000000')
+# Unlimited ERC20 allowance: approve the router once rather than before every swap
+MAX_UINT256 = 2**256 - 1
+# Multicall3 has the same address on Base, mainnet and most other EVM chains
+MULTICALL3_ADDRESS = to_checksum_address('0xcA11bde05977b3631167028862bE2a173976CA11')
+
+SEL_BALANCE_OF = ERC20_SELECTORS['balanceOf']
+SEL_ALLOWANCE = ERC20_SELECTORS['allowance']
+SEL_APPROVE = ERC20_SELECTORS['approve']
+SEL_GET_ETH_BALANCE = MULTICALL3_SELECTORS['getEthBalance']
+
+# BSC, BSC testnet, Polygon, Mumbai
+POA_CHAIN_IDS = frozenset({56, 97, 137, 80001})
+
+# eth_feeHistory sample used to price EIP-1559 transactions: last 5 blocks, median tip
+FEE_HISTORY_BLOCKS = 5
+FEE_HISTORY_PERCENTILES = [50]
+# Seconds a derived fee quote is reused before eth_feeHistory is queried again
+FEE_CACHE_TTL = 5.0
+
+# Gas limits used until eth_estimateGas has succeeded once for a path
+DEFAULT_GAS_LIMITS = {'approve': 100000, 'eth_to_usdc': 600000, 'usdc_to_eth': 500000}
+# Cached estimates are padded to 120% so pool state drift between swaps doesn't run out of gas
+GAS_LIMIT_MARGIN_PCT = 120
+ESTIMATE_GAS_FIELDS = ('from', 'to', 'value', 'data')
+
+def eip1559_fees(fee_history):
+    """
+    Derive type-2 fee fields from an eth_feeHistory result
+
+    :param fee_history: Result of ``fee_history(FEE_HISTORY_BLOCKS, 'latest', FEE_HISTORY_PERCENTILES)``
+    :return: Dict with maxFeePerGas / maxPriorityFeePerGas / type to merge into a transaction
+    """
+    # baseFeePerGas has one extra trailing entry: the base fee of the next block
+    base_fee = fee_history['baseFeePerGas'][-1]
+    # Median across blocks of each block's median tip, so one outlier block does not skew it
+    rewards = fee_history['reward']
+    tip = int(statistics.median(r[0] for r in rewards)) if rewards else 0
+    return {
+        'maxFeePerGas': base_fee * 2 + tip,
+        'maxPriorityFeePerGas': tip,
+        'type': 2
+    }
+
+def address_word(address):
+    """Left-pad a 20-byte address to a 32-byte ABI word"""
+    return bytes(12) + bytes.fromhex(address[2:])
+
+def approve_calldata(spender, amount):
+    """ERC20 approve(spender, amount) calldata, encoded without a Contract object or RPC"""
+    return SEL_APPROVE + address_word(spender) + amount.to_bytes(32, 'big')
+
+def balance_calls(owner, token_address, spender):
+    """Multicall3 aggregate3 calls reading owner's ETH balance, token balance and token allowance for spender"""
+    owner_word = address_word(owner)
+    return [
+        (MULTICALL3_ADDRESS, False, SEL_GET_ETH_BALANCE + owner_word),
+        (token_address, False, SEL_BALANCE_OF + owner_word),
+        (token_address, False, SEL_ALLOWANCE + owner_word + address_word(spender))
+    ]
+
+def decode_uint_results(results):
+    """Decode aggregate3 (success, returnData) pairs whose calls each return a single uint256"""
+    return tuple(int.from_bytes(return_data, 'big') for _, return_data in results)
+
+class SwapCalldata:
+    """
+    Universal Router calldata for exact-in swaps on one v4 pool, patched into a per-direction template
+
+    The codec runs once per direction with sentinel amounts; each swap after that only substitutes the
+    two 32-byte amount words instead of re-running the builder.
+    """
+
+    # Distinct uint128 values whose ABI words are located in the template
+    AMOUNT_IN_SENTINEL = int('a1' * 16, 16)
+    AMOUNT_OUT_MIN_SENTINEL = int('b2' * 16, 16)
+
+    def __init__(self, router_codec, pool_key, usdc_address):
+        self.router_codec = router_codec
+        self.pool_key = pool_key
+        self.usdc_address = usdc_address
+        # zero_for_one -> template bytes, or None when the sentinels could not be located exactly once
+        self._templates = {}
+
+    def _encode(self, zero_for_one, amount_in, amount_out_min):
+        builder = self.router_codec.encode.chain().v4_swap()
+        # Token ordering: ETH (0x000...) < USDC (0x833...), so ETH -> USDC is zero_for_one
+        builder.swap_exact_in_single(
+            pool_key=self.pool_key,
+            zero_for_one=zero_for_one,
+            amount_in=amount_in,
+            amount_out_min=amount_out_min
+        )
+        if zero_for_one:
+            builder.take_all(self.usdc_address, 0)
+        else:
+            # settle_all to send native ETH to recipient (address zero denotes native)
+            builder.settle_all(ZERO_ADDR, 0)
+        return bytes(HexBytes(builder.build_v4_swap().build()))
+
+    @staticmethod
+    def _word(value):
+        return value.to_bytes(32, 'big')
+
+    def build(self, zero_for_one, amount_in, amount_out_min):
+        if zero_for_one not in self._templates:
+            template = self._encode(zero_for_one, self.AMOUNT_IN_SENTINEL, self.AMOUNT_OUT_MIN_SENTINEL)
+            found = all(
+                template.count(self._word(s)) == 1 for s in (self.AMOUNT_IN_SENTINEL, self.AMOUNT_OUT_MIN_SENTINEL)
+            )
+            self._templates[zero_for_one] = template if found else None
+
+        template = self._templates[zero_for_one]
+        if template is None:
+            return self._encode(zero_for_one, amount_in, amount_out_min)
+        return (template
+                .replace(self._word(self.AMOUNT_IN_SENTINEL), self._word(amount_in))
+                .replace(self._word(self.AMOUNT_OUT_MIN_SENTINEL), self._word(amount_out_min)))
 
-class UniversalRouterSwapper:
-    def __init__(self):
-        self.rpc_url = os.getenv('RPC_URL')
-        if not self.rpc_url:
-            raise ValueError("RPC_URL not found in environment variables")
+def print_balances(eth_balance, usdc_balance, usdc_allowance):
+    print(f"ETH Balance: {eth_balance / WEI_PER_ETH:.4f} ETH")
+    print(f"USDC Balance: {usdc_balance / USDC_UNIT:.2f} USDC")
+    print(f"USDC Allowance (Universal Router): {usdc_allowance / USDC_UNIT:.2f} USDC")
 
-        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
-        self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+class SwapperBase:
+    """
+    Wallet, contract and calldata state shared by UniversalRouterSwapper and AsyncUniversalRouterSwapper
 
-        if not self.w3.is_connected():
-            raise ConnectionError("Failed to connect to Ethereum network")
+    Everything here only builds objects or dicts, so it works unchanged on a Web3 or an AsyncWeb3.
+    """
 
-        private_key = os.getenv('PRIVATE_KEY')
-        if not private_key:
-            raise ValueError("PRIVATE_KEY not found in environment variables")
+    def __init__(self, config, w3):
+        self.config = config
+        self.rpc_url = config.rpc_url
+        self.w3 = w3
 
-        self.account = Account.from_key(private_key)
+        self.account = Account.from_key(config.private_key)
         print(f"Connected to wallet: {self.account.address}")
 
-        ur_raw = os.getenv('UNIVERSAL_ROUTER_ADDRESS')
-        if not ur_raw:
-            raise ValueError("UNIVERSAL_ROUTER_ADDRESS not found in environment variables")
-        self.universal_router_address = self.w3.to_checksum_address(ur_raw)
+        self.universal_router_address = config.router
+        self.usdc_address = config.usdc
+
+        # ERC20 contract objects keyed by address; building one re-parses the ABI and rehashes selectors
+        self._erc20_cache = {}
+        self.usdc_contract = self._erc20(self.usdc_address)
+        self.multicall = w3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+
+        # Encoding only: nonce, fees and chain id are fetched once per swap and passed in explicitly,
+        # rather than letting the builder's build_transaction query them again
+        self.router_codec = RouterCodec()
+
+        # The ETH/USDC v4 pool key is fixed (no hooks); ETH sorts first as currency0
+        self._eth_usdc_pool_key = self.router_codec.encode.v4_pool_key(
+            ZERO_ADDR,
+            self.usdc_address,
+            config.pool_fee,
+            config.tick_spacing,
+            ZERO_ADDR
+        )
+        self._swap_calldata = SwapCalldata(self.router_codec, self._eth_usdc_pool_key, self.usdc_address)
+
+        # (fees, monotonic expiry) of the last eth_feeHistory quote
+        self._fee_cache = None
+
+        # Padded eth_estimateGas result per path (see DEFAULT_GAS_LIMITS); the pool key is fixed,
+        # so the path alone identifies the call shape
+        self._gas_cache = {}
+
+    def _erc20(self, token_address):
+        contract = self._erc20_cache.get(token_address)
+        if contract is None:
+            contract = self._erc20_cache[token_address] = self.w3.eth.contract(address=token_address, abi=ERC20_ABI)
+        return contract
+
+    def _transaction(self, to, value, data, nonce, fees):
+        """Assemble an unsigned transaction (without gas) from already-fetched nonce and fee fields"""
+        return {
+            'from': self.account.address,
+            'to': to,
+            'value': value,
+            'data': data,
+            'nonce': nonce,
+            'chainId': self.chain_id,
+            **fees
+        }
+
+    def _approve_transaction(self, nonce, fees):
+        """Unlimited USDC approve for the Universal Router, encoded locally so it can be signed before anything is sent"""
+        return self._transaction(
+            self.usdc_address, 0, approve_calldata(self.universal_router_address, MAX_UINT256), nonce, fees
+        )
+
+    def _store_gas_estimate(self, path, estimate):
+        """Cache an eth_estimateGas result for a path with GAS_LIMIT_MARGIN_PCT headroom and return the limit"""
+        limit = self._gas_cache[path] = estimate * GAS_LIMIT_MARGIN_PCT // 100
+        return limit
+
+class UniversalRouterSwapper(SwapperBase):
+    def __init__(self, batch_enabled=True, config=None):
+        config = config or load_config()
+
+        # No is_connected() handshake: the first real RPC below fails just as loudly on a bad RPC_URL
+        super().__init__(config, Web3(PooledHTTPProvider(config.rpc_url, pool_size=config.pool_size)))
+
+        # Never changes for the lifetime of the connection
+        self.chain_id = config.chain_id or self.w3.eth.chain_id
+
+        # Only PoA chains need their extraData rewritten; Base (OP stack) and mainnet (PoS) skip the per-response pass
+        if self.chain_id in POA_CHAIN_IDS:
+            self.w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
 
-        usdc_raw = os.getenv('USDC_ADDRESS')
-        if not usdc_raw:
-            raise ValueError("USDC_ADDRESS not found in environment variables")
-        self.usdc_address = self.w3.to_checksum_address(usdc_raw)
+        # Next nonce to use, counted locally after this one lookup; call resync_nonce() after a failed send
+        self._nonce = self.w3.eth.get_transaction_count(self.account.address, 'pending')
 
-        # Provide our Web3 instance to RouterCodec so builder can query chain/nonce/etc.
-        self.router_codec = RouterCodec(self.w3)
+        # Coalesce independent reads into one JSON-RPC batch; turn off for providers that bill per call
+        self.batch_enabled = batch_enabled
+
+    def _next_nonce(self):
+        nonce = self._nonce
+        self._nonce += 1
+        return nonce
+
+    def resync_nonce(self):
+        """Reload the local nonce counter from the node's pending transaction count"""
+        self._nonce = self.w3.eth.get_transaction_count(self.account.address, 'pending')
+        return self._nonce
 
     def get_balance(self, token_address=None):
         if token_address is None:
             return self.w3.eth.get_balance(self.account.address)
         else:
-            contract = self.w3.eth.contract(address=token_address, abi=ERC20_ABI)
-            return contract.functions.balanceOf(self.account.address).call()
+            return self._erc20(token_address).functions.balanceOf(self.account.address).call()
+
+    def get_balance_fast(self, token_address, owner=None):
+        """balanceOf via a raw eth_call, skipping the Contract encode/decode layer"""
+        data = SEL_BALANCE_OF + address_word(owner or self.account.address)
+        raw = self.w3.eth.call({'to': token_address, 'data': data})
+        return int.from_bytes(raw, 'big')
+
+    def check_allowance(self, token_address, spender):
+        """allowance(owner, spender) via a raw eth_call"""
+        data = SEL_ALLOWANCE + address_word(self.account.address) + address_word(spender)
+        raw = self.w3.eth.call({'to': token_address, 'data': data})
+        return int.from_bytes(raw, 'big')
+
+    def batch_read(self, *reads):
+        """
+        Evaluate independent reads in a single JSON-RPC round-trip
+
+        :param reads: Zero-arg callables returning a web3 request, e.g. ``lambda: w3.eth.get_balance(addr)``
+                      or an uncalled contract function such as ``lambda: token.functions.balanceOf(addr)``
+        """
+        if not self.batch_enabled:
+            results = []
+            for read in reads:
+                result = read()
+                results.append(result.call() if isinstance(result, ContractFunction) else result)
+            return results
+
+        with self.w3.batch_requests() as batch:
+            for read in reads:
+                batch.add(read())
+            return batch.execute()
+
+    def batch_read_with_fees(self, *reads):
+        """
+        batch_read plus EIP-1559 fee fields appended as the last result; fees come from a
+        FEE_CACHE_TTL-second cache when fresh, otherwise eth_feeHistory rides in the same batch
+        """
+        if self._fee_cache is not None and time.monotonic() < self._fee_cache[1]:
+            return (*self.batch_read(*reads), self._fee_cache[0])
+
+        *results, fee_history = self.batch_read(
+            *reads,
+            lambda: self.w3.eth.fee_history(FEE_HISTORY_BLOCKS, 'latest', FEE_HISTORY_PERCENTILES)
+        )
+        fees = eip1559_fees(fee_history)
+        self._fee_cache = (fees, time.monotonic() + FEE_CACHE_TTL)
+        return (*results, fees)
+
+    def get_balances(self):
+        """
+        Return (eth_balance_wei, usdc_balance, usdc_allowance_for_router) from one Multicall3 eth_call,
+        so all three are read from the same block
+        """
+        calls = balance_calls(self.account.address, self.usdc_address, self.universal_router_address)
+        eth_balance, usdc_balance, usdc_allowance = decode_uint_results(
+            self.multicall.functions.aggregate3(calls).call()
+        )
+        return eth_balance, usdc_balance, usdc_allowance
+
+    def _gas_limit(self, path, trx=None):
+        """
+        Gas limit for a path: estimated once and cached with GAS_LIMIT_MARGIN_PCT headroom
+
+        :param path: Key of DEFAULT_GAS_LIMITS
+        :param trx: Transaction to estimate on a cache miss; None when it cannot be simulated yet
+                    (e.g. a swap whose approve is still pending), which returns the default
+        """
+        limit = self._gas_cache.get(path)
+        if limit is None and trx is not None:
+            try:
+                estimate = self.w3.eth.estimate_gas({k: trx[k] for k in ESTIMATE_GAS_FIELDS})
+            except (ContractLogicError, Web3RPCError):
+                return DEFAULT_GAS_LIMITS[path]
+            limit = self._store_gas_estimate(path, estimate)
+        return DEFAULT_GAS_LIMITS[path] if limit is None else limit
+
+    def _build_router_transaction(self, data, value, nonce, fees, gas_path, estimate_gas=True):
+        """Assemble a Universal Router execute() transaction from already-fetched fields"""
+        trx = self._transaction(self.universal_router_address, value, data, nonce, fees)
+        trx['gas'] = self._gas_limit(gas_path, trx if estimate_gas else None)
+        return trx
+
+    def swap_eth_to_usdc(self, eth_amount_wei, simulate=False, wait=True):
+        """
+        Swap ETH to USDC using Universal Router V4 builder
+
+        :param eth_amount_wei: Amount of ETH to swap (in wei)
+        :param simulate: Dry-run the transaction with eth_call before sending (one extra RPC)
+        :param wait: Wait for the receipt; with False the hash is returned as soon as it is broadcast
+        :return: Transaction hash, or None if nothing was broadcast (or, when waiting, the swap did not succeed)
+        """
+        print(f"🔍 Network: Base ({self.chain_id})")
+        print(f"🔍 Amount: {eth_amount_wei / WEI_PER_ETH} ETH")
+
+        # Fetch balance and (unless cached) fees in one round-trip
+        balance, fees = self.batch_read_with_fees(
+            lambda: self.w3.eth.get_balance(self.account.address)
+        )
 
-    def swap_eth_to_usdc(self, eth_amount_wei):
-        print(f"🔍 Network: Base ({self.w3.eth.chain_id})")
-        print(f"🔍 Amount: {self.w3.from_wei(eth_amount_wei, 'ether')} ETH")
-        
         # Validate balance
-        balance = self.get_balance()
-        gas_buffer = self.w3.to_wei(0.0003, 'ether')
+        gas_buffer = 3 * WEI_PER_ETH // 10_000  # 0.0003 ETH
         if balance < eth_amount_wei + gas_buffer:
             raise ValueError(f"Insufficient ETH balance")
 
-        # Use the exact pool parameters from the screenshot
-        pool_key = self.router_codec.encode.v4_pool_key(
-            '0x0000000000000000000000000000000000000000',  # ETH (native)
-            self.usdc_address,  # 0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913
-            500,   # 0.05% fee (confirmed from screenshot)
-            10,    # tick spacing (standard for 0.05%)
-            '0x0000000000000000000000000000000000000000'  # no hooks
-        )
-        
         # Calculate reasonable minimum output
         # From pool: ~84.87 ETH / 394.6K USDC = ~4650 USDC per ETH
-        eth_amount_ether = float(self.w3.from_wei(eth_amount_wei, 'ether'))  
-        estimated_usdc = eth_amount_ether * 4650  # Use pool ratio
-        min_usdc_out = int(estimated_usdc * 0.95 * 10**6)  # 5% slippage, 6 decimals
-        
+        eth_amount_ether = eth_amount_wei / WEI_PER_ETH
+        estimated_usdc = eth_amount_ether * 4650  # Use pool ratio (float is fine for display)
+        min_usdc_out = eth_amount_wei * 4650 * 95 * USDC_UNIT // (100 * WEI_PER_ETH)  # 5% slippage, integer-only
+
         print(f"📊 Estimated USDC out: {estimated_usdc:.4f}")
-        print(f"📊 Minimum USDC (5% slippage): {min_usdc_out / 10**6:.4f}")
-        
-        # Build swap
-        builder = self.router_codec.encode.chain().v4_swap()
-        
-        # Double-check token ordering: ETH (0x000...) < USDC (0x833...)
-        # So ETH is token0, USDC is token1, zero_for_one = True ✓
-        builder.swap_exact_in_single(
-            pool_key=pool_key,
-            zero_for_one=True,  # ETH -> USDC
-            amount_in=eth_amount_wei,
-            amount_out_min=max(min_usdc_out, 100000)  # At least 0.1 USDC
-        )
-        builder.take_all(self.usdc_address, 0)
+        print(f"📊 Minimum USDC (5% slippage): {min_usdc_out / USDC_UNIT:.4f}")
         
         try:
-            v4_swap = builder.build_v4_swap()
-            trx = v4_swap.build_transaction(
-                self.account.address,
+            data = self._swap_calldata.build(
+                True,  # ETH -> USDC
                 eth_amount_wei,
-                ur_address=self.universal_router_address,
-                gas_limit=600000  # Increase gas limit
+                max(min_usdc_out, 100000)  # At least 0.1 USDC
+            )
+            trx = self._build_router_transaction(
+                data,
+                eth_amount_wei,
+                self._next_nonce(),
+                fees,
+                'eth_to_usdc'
             )
             
-            # Simulate first
-            print("🔄 Simulating transaction...")
-            self.w3.eth.call(trx)
-            print("✅ Simulation passed!")
+            if simulate:
+                print("🔄 Simulating transaction...")
+                self.w3.eth.call(trx, 'pending')
+                print("✅ Simulation passed!")
             
             # Send transaction
-            signed = self.w3.eth.account.sign_transaction(trx, self.account.key)
+            signed = self.account.sign_transaction(trx)
             tx_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
-            
-            print(f"📤 Transaction sent: {tx_hash.hex()}")
-            print("⏳ Waiting for confirmation...")
-            
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
-            
-            if receipt.status == 1:
-                print(f"✅ SUCCESS! Gas used: {receipt.gasUsed}")
-                return tx_hash
-            else:
-                print(f"❌ Transaction failed on-chain")
-                return None
-                
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            self.resync_nonce()
+            return None
+
+        print(f"📤 Transaction sent: {tx_hash.hex()}")
+        if not wait:
+            return tx_hash
+        print("⏳ Waiting for confirmation...")
+
+        try:
+            receipt = self.wait_for_transaction(tx_hash, timeout=120)
         except Exception as e:
             print(f"❌ Error: {e}")
             return None
 
+        if receipt.status == 1:
+            print(f"✅ SUCCESS! Gas used: {receipt.gasUsed}")
+            return tx_hash
+        else:
+            print(f"❌ Transaction failed on-chain")
+            return None
+
     def swap_usdc_to_eth(self, usdc_amount):
         """
         Swap USDC to ETH using Universal Router V4 builder (v4_swap -> swap_exact_in_single)
         
         :param usdc_amount: Amount of USDC to swap (in smallest units)
         """
+        # Fetch balance, router allowance and (unless cached) fees in one round-trip
+        usdc_balance, usdc_allowance, fees = self.batch_read_with_fees(
+            lambda: self.usdc_contract.functions.balanceOf(self.account.address),
+            lambda: self.usdc_contract.functions.allowance(self.account.address, self.universal_router_address)
+        )
+
         # Validate USDC balance
-        usdc_balance = self.get_balance(self.usdc_address)
         if usdc_balance < usdc_amount:
             raise ValueError("Insufficient USDC balance")
 
-        # Approve Universal Router to spend USDC
-        usdc_contract = self.w3.eth.contract(address=self.usdc_address, abi=ERC20_ABI)
-        approve_tx = usdc_contract.functions.approve(self.universal_router_address, usdc_amount).build_transaction({
-            'from': self.account.address,
-            'nonce': self.w3.eth.get_transaction_count(self.account.address),
-            'gas': 100000,
-            'gasPrice': self.w3.eth.gas_price
-        })
-        signed_approve_tx = self.w3.eth.account.sign_transaction(approve_tx, self.account.key)
-        approve_tx_hash = self.w3.eth.send_raw_transaction(signed_approve_tx.raw_transaction)
-        self.w3.eth.wait_for_transaction_receipt(approve_tx_hash)
-
-        # Build pool key dict using RouterCodec helper
-        pool_key = self.router_codec.encode.v4_pool_key(
-            self.usdc_address,
-            '0x0000000000000000000000000000000000000000',  # native ETH
-            500,  # fee (0.05%)
-            10,   # tick spacing
-            '0x0000000000000000000000000000000000000000'  # hooks
-        )
-
-        # Use the builder API to construct a v4 swap transaction (exact in single)
-        builder = self.router_codec.encode.chain().v4_swap()
-        # swap_exact_in_single args: pool_key, zero_for_one, amount_in, amount_out_min
-        builder.swap_exact_in_single(
-            pool_key=pool_key,
-            zero_for_one=False,
-            amount_in=usdc_amount,
-            amount_out_min=0
-        )
-        # settle_all to send native ETH to recipient (address zero denotes native)
-        builder.settle_all('0x0000000000000000000000000000000000000000', 0)
-
-        # finalize builder and produce transaction dict targeting the Universal Router
-        v4_swap = builder.build_v4_swap()
+        # Approve Universal Router to spend USDC, unless an earlier unlimited approve still covers it
+        needs_approve = usdc_allowance < usdc_amount
+        signed_approve_tx = None
+        # From the first _next_nonce() to the last send, any failure may leave a taken nonce unsent
         try:
-            # Provide a conservative gas_limit to avoid RPC estimate_gas (which can revert during simulation)
-            trx = v4_swap.build_transaction(
-                self.account.address,
+            if needs_approve:
+                approve_tx = self._approve_transaction(self._next_nonce(), fees)
+                approve_tx['gas'] = self._gas_limit('approve', approve_tx)
+                signed_approve_tx = self.account.sign_transaction(approve_tx)
+
+            # v4 exact-in single swap (USDC -> ETH) targeting the Universal Router;
+            # can't be estimated while an approve is unsent (it would revert), so then use the cached/default limit
+            trx = self._build_router_transaction(
+                self._swap_calldata.build(False, usdc_amount, 0),
                 0,
-                ur_address=self.universal_router_address,
-                gas_limit=500000
+                self._next_nonce(),  # follows the approve, if any
+                fees,
+                'usdc_to_eth',
+                estimate_gas=not needs_approve
             )
-        except Exception as e:
-            print("❌ Error building transaction (did RPC simulation revert?):", str(e))
-            traceback.print_exc()
+            return self._send_after_approve(signed_approve_tx, self.account.sign_transaction(trx))
+        except Exception:
+            self.resync_nonce()
             raise
 
-        # Sign and broadcast
-        signed = self.w3.eth.account.sign_transaction(trx, self.account.key)
-        tx_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
-        return tx_hash
+    def _send_after_approve(self, signed_approve_tx, signed):
+        """
+        Broadcast an optional approve and the swap back-to-back; consecutive nonces already order them,
+        so there is no need to wait a block for the approve receipt in between. Returns the swap hash.
+        """
+        approve_tx_hash = None
+        try:
+            if signed_approve_tx is not None:
+                approve_tx_hash = self.w3.eth.send_raw_transaction(signed_approve_tx.raw_transaction)
+            return self.w3.eth.send_raw_transaction(signed.raw_transaction)
+        except Web3RPCError as e:
+            if approve_tx_hash is None or 'nonce too high' not in str(e).lower():
+                raise
+            # Node refused to queue the swap behind the pending approve: fall back to waiting for it
+            self.wait_for_transaction(approve_tx_hash)
+            return self.w3.eth.send_raw_transaction(signed.raw_transaction)
+
+    def wait_for_transaction(self, tx_hash, timeout=300, poll_interval=3.0, w3=None):
+        """
+        Wait for transaction confirmation (raises TimeExhausted on timeout)
+
+        :param w3: Web3 to poll through instead of self.w3; callers on other threads need their own,
+                   since batch_requests() puts the shared provider into batching mode for every thread
+        """
+        if self.config.ws_url:
+            return asyncio.run(wait_for_receipt_ws(self.config.ws_url, tx_hash, timeout))
+        return poll_for_receipt(w3 or self.w3, tx_hash, timeout=timeout, poll_interval=poll_interval)
 
-    def wait_for_transaction(self, tx_hash, timeout=300):
-        """Wait for transaction confirmation"""
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            try:
-                receipt = self.w3.eth.get_transaction_receipt(tx_hash)
-                if receipt:
-                    return receipt
-            except:
-                pass
-            time.sleep(2)
-        raise TimeoutError(f"Transaction {tx_hash.hex()} not confirmed within {timeout} seconds")
+def display_balances(swapper):
+    print_balances(*swapper.get_balances())
 
 def interactive_swap(swapper):
     while True:
@@ -220,21 +498,24 @@ def interactive_swap(swapper):
             choice = input("Select option (1-4): ").strip()
 
             if choice == "1":
-                print(f"ETH Balance: {swapper.w3.from_wei(swapper.get_balance(), 'ether'):.4f} ETH")
-                print(f"USDC Balance: {swapper.get_balance(swapper.usdc_address) / 10**6:.2f} USDC")
+                display_balances(swapper)
                 input("\nPress Enter to continue...")
 
             elif choice == "2":
                 try:
                     amount_str = input("Enter ETH amount to swap: ").strip()
-                    eth_amount = float(amount_str)
-                    eth_amount_wei = swapper.w3.to_wei(eth_amount, 'ether')
+                    eth_amount_wei = parse_eth(amount_str)
 
-                    tx_hash = swapper.swap_eth_to_usdc(eth_amount_wei)
+                    tx_hash = swapper.swap_eth_to_usdc(eth_amount_wei, simulate=True, wait=False)
+                    if tx_hash is None:
+                        continue
                     print("⏳ Waiting for transaction confirmation...")
                     receipt = swapper.wait_for_transaction(tx_hash)
                     print(f"✅ Swap completed! Transaction: {receipt.transactionHash.hex()}")
 
+                except TimeExhausted as e:
+                    print(f"❌ Timed out waiting for confirmation: {e}")
+
                 except ValueError as e:
                     print(f"❌ Error: {str(e)}")
                     traceback.print_exc()
@@ -242,14 +523,16 @@ def interactive_swap(swapper):
             elif choice == "3":
                 try:
                     amount_str = input("Enter USDC amount to swap: ").strip()
-                    usdc_amount = float(amount_str)
-                    usdc_amount_int = int(usdc_amount * 10**6)
+                    usdc_amount_int = parse_usdc(amount_str)
 
                     tx_hash = swapper.swap_usdc_to_eth(usdc_amount_int)
                     print("⏳ Waiting for transaction confirmation...")
                     receipt = swapper.wait_for_transaction(tx_hash)
                     print(f"✅ Swap completed! Transaction: {receipt.transactionHash.hex()}")
 
+                except TimeExhausted as e:
+                    print(f"❌ Timed out waiting for confirmation: {e}")
+
                 except ValueError as e:
                     print(f"❌ Error: {str(e)}")
                     traceback.print_exc()
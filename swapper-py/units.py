@@ -0,0 +1,41 @@
+"""
+Token unit scales shared by the swappers and the CLI (kept free of web3 imports so it loads fast)
+"""
+
+from decimal import Decimal, InvalidOperation
+
+# Integer unit scales; cheaper than to_wei/from_wei, which round-trip through Decimal
+WEI_PER_ETH = 10**18
+USDC_UNIT = 10**6  # USDC has 6 decimals
+
+def _require_positive(units, amount_str):
+    if units <= 0:
+        raise ValueError(f"Amount must be positive: {amount_str!r}")
+    return units
+
+def _parse_units(amount_str, decimals):
+    try:
+        amount = Decimal(amount_str.strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {amount_str!r}") from None
+    # Infinity/NaN would otherwise escape as OverflowError/ValueError from int() below
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount: {amount_str!r}")
+    # Exact decimal scaling; float(amount) * 10**decimals would turn e.g. 0.1 USDC into 99999
+    return _require_positive(int(amount.scaleb(decimals)), amount_str)
+
+def parse_base_units(amount_str):
+    """Parse an integer amount already in the token's smallest unit"""
+    try:
+        units = int(amount_str)
+    except ValueError:
+        raise ValueError(f"Invalid amount: {amount_str!r}") from None
+    return _require_positive(units, amount_str)
+
+def parse_eth(amount_str):
+    """Parse a decimal ETH amount string into wei"""
+    return _parse_units(amount_str, 18)
+
+def parse_usdc(amount_str):
+    """Parse a decimal USDC amount string into base units"""
+    return _parse_units(amount_str, 6)
@@ -1,5 +1,9 @@
 import os
-import json
+import statistics
+from decimal import Decimal
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 from web3 import Web3
 
@@ -12,36 +16,67 @@ PRIVATE_KEY = os.getenv("PRIVATE_KEY")
 UNISWAP_V4_ROUTER_ADDRESS = "0x4a7A52CFc73785C590c836945d2045a919A43b14" 
 USDC_ADDRESS = "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"  # Base USDC
 WETH_ADDRESS = "0x4200000000000000000000000000000000000006"  # Base WETH
+# Decimal, not float, so the wei amount is exact
+SWAP_AMOUNT_ETH = Decimal("0.00025")
 
 # --- Web3 Connection ---
-w3 = Web3(Web3.HTTPProvider(BASE_RPC_URL))
-if not w3.is_connected():
-    raise ConnectionError("Failed to connect to Base node")
+# Keep-alive session so the balance reads, nonce/gas lookups and receipt polling reuse one TCP/TLS connection
+# WEB3_POOL_SIZE caps the connections kept open to the RPC host
+_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=int(os.getenv("WEB3_POOL_SIZE", "32")),
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 502, 503, 504], allowed_methods=frozenset(['POST']))
+)
+SESSION = requests.Session()
+SESSION.mount('https://', _adapter)
+SESSION.mount('http://', _adapter)
+
+# No is_connected() handshake; the first balance read fails just as loudly on a bad BASE_RPC_URL
+w3 = Web3(Web3.HTTPProvider(BASE_RPC_URL, session=SESSION, request_kwargs={'timeout': 10}))
 
 account = w3.eth.account.from_key(PRIVATE_KEY)
 w3.eth.default_account = account.address
 
 # --- ABIs ---
 # A minimal ABI for ERC20 tokens
-ERC20_ABI = json.loads('[{"constant":true,"inputs":[],"name":"name","outputs":[{"name":"","type":"string"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"_spender","type":"address"},{"name":"_value","type":"uint256"}],"name":"approve","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"totalSupply","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"_from","type":"address"},{"name":"_to","type":"address"},{"name":"_value","type":"uint256"}],"name":"transferFrom","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"decimals","outputs":[{"name":"","type":"uint8"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"name":"_owner","type":"address"}],"name":"balanceOf","outputs":[{"name":"balance","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"symbol","outputs":[{"name":"","type":"string"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"_to","type":"address"},{"name":"_value","type":"uint256"}],"name":"transfer","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"name":"_owner","type":"address"},{"name":"_spender","type":"address"}],"name":"allowance","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"}]')
+ERC20_ABI = [
+    {'constant': True, 'inputs': [], 'name': 'name', 'outputs': [{'name': '', 'type': 'string'}], 'payable': False, 'stateMutability': 'view', 'type': 'function'},
+    {'constant': False, 'inputs': [{'name': '_spender', 'type': 'address'}, {'name': '_value', 'type': 'uint256'}], 'name': 'approve', 'outputs': [{'name': '', 'type': 'bool'}], 'payable': False, 'stateMutability': 'nonpayable', 'type': 'function'},
+    {'constant': True, 'inputs': [], 'name': 'totalSupply', 'outputs': [{'name': '', 'type': 'uint256'}], 'payable': False, 'stateMutability': 'view', 'type': 'function'},
+    {'constant': False, 'inputs': [{'name': '_from', 'type': 'address'}, {'name': '_to', 'type': 'address'}, {'name': '_value', 'type': 'uint256'}], 'name': 'transferFrom', 'outputs': [{'name': '', 'type': 'bool'}], 'payable': False, 'stateMutability': 'nonpayable', 'type': 'function'},
+    {'constant': True, 'inputs': [], 'name': 'decimals', 'outputs': [{'name': '', 'type': 'uint8'}], 'payable': False, 'stateMutability': 'view', 'type': 'function'},
+    {'constant': True, 'inputs': [{'name': '_owner', 'type': 'address'}], 'name': 'balanceOf', 'outputs': [{'name': 'balance', 'type': 'uint256'}], 'payable': False, 'stateMutability': 'view', 'type': 'function'},
+    {'constant': True, 'inputs': [], 'name': 'symbol', 'outputs': [{'name': '', 'type': 'string'}], 'payable': False, 'stateMutability': 'view', 'type': 'function'},
+    {'constant': False, 'inputs': [{'name': '_to', 'type': 'address'}, {'name': '_value', 'type': 'uint256'}], 'name': 'transfer', 'outputs': [{'name': '', 'type': 'bool'}], 'payable': False, 'stateMutability': 'nonpayable', 'type': 'function'},
+    {'constant': True, 'inputs': [{'name': '_owner', 'type': 'address'}, {'name': '_spender', 'type': 'address'}], 'name': 'allowance', 'outputs': [{'name': '', 'type': 'uint256'}], 'payable': False, 'stateMutability': 'view', 'type': 'function'}
+]
 
 # Uniswap V4 Router ABI (simplified for this example)
-UNISWAP_V4_ROUTER_ABI = json.loads('[{"inputs":[{"components":[{"internalType":"address","name":"tokenIn","type":"address"},{"internalType":"address","name":"tokenOut","type":"address"},{"internalType":"uint24","name":"fee","type":"uint24"}],"internalType":"struct IMultiHopSwap.Path[]","name":"path","type":"tuple[]"},{"internalType":"uint256","name":"amountIn","type":"uint256"},{"internalType":"uint256","name":"minAmountOut","type":"uint256"}],"name":"swap","outputs":[],"stateMutability":"payable","type":"function"}]')
+UNISWAP_V4_ROUTER_ABI = [
+    {'inputs': [{'components': [{'internalType': 'address', 'name': 'tokenIn', 'type': 'address'}, {'internalType': 'address', 'name': 'tokenOut', 'type': 'address'}, {'internalType': 'uint24', 'name': 'fee', 'type': 'uint24'}], 'internalType': 'struct IMultiHopSwap.Path[]', 'name': 'path', 'type': 'tuple[]'}, {'internalType': 'uint256', 'name': 'amountIn', 'type': 'uint256'}, {'internalType': 'uint256', 'name': 'minAmountOut', 'type': 'uint256'}], 'name': 'swap', 'outputs': [], 'stateMutability': 'payable', 'type': 'function'}
+]
 
 # --- Contract Instances ---
 usdc_contract = w3.eth.contract(address=USDC_ADDRESS, abi=ERC20_ABI)
 uniswap_router = w3.eth.contract(address=UNISWAP_V4_ROUTER_ADDRESS, abi=UNISWAP_V4_ROUTER_ABI)
 
-def get_eth_balance():
-    """Returns the ETH balance of the account in Ether."""
-    balance_wei = w3.eth.get_balance(account.address)
-    return w3.from_wei(balance_wei, 'ether')
+# Fixed by the Base USDC contract; no decimals() call needed
+USDC_DECIMALS = 6
 
-def get_usdc_balance():
-    """Returns the USDC balance of the account."""
-    balance = usdc_contract.functions.balanceOf(account.address).call()
-    decimals = usdc_contract.functions.decimals().call()
-    return balance / (10 ** decimals)
+def eip1559_fees(fee_history):
+    """Returns type-2 fee fields derived from a fee_history(5, 'latest', [50]) sample."""
+    # baseFeePerGas has one extra trailing entry: the base fee of the next block
+    base_fee = fee_history['baseFeePerGas'][-1]
+    tip = int(statistics.median(r[0] for r in fee_history['reward'])) if fee_history['reward'] else 0
+    return {'maxFeePerGas': base_fee * 2 + tip, 'maxPriorityFeePerGas': tip, 'type': 2}
+
+def get_balances():
+    """Returns the (ETH, USDC) balances of the account, fetched in a single JSON-RPC batch."""
+    with w3.batch_requests() as batch:
+        batch.add(w3.eth.get_balance(account.address))
+        batch.add(usdc_contract.functions.balanceOf(account.address))
+        balance_wei, usdc_balance = batch.execute()
+    return w3.from_wei(balance_wei, 'ether'), Decimal(usdc_balance).scaleb(-USDC_DECIMALS)
 
 def swap_eth_for_usdc():
     """
@@ -49,11 +84,12 @@ def swap_eth_for_usdc():
     """
     print("--- Uniswap V4 ETH to USDC Swapper on Base ---")
     print(f"Account: {account.address}")
-    print(f"Initial ETH Balance: {get_eth_balance():.6f} ETH")
-    print(f"Initial USDC Balance: {get_usdc_balance():.6f} USDC")
+    eth_balance, usdc_balance = get_balances()
+    print(f"Initial ETH Balance: {eth_balance:.6f} ETH")
+    print(f"Initial USDC Balance: {usdc_balance:.6f} USDC")
     print("-" * 50)
 
-    amount_in = w3.to_wei(0.00025, 'ether')
+    amount_in = w3.to_wei(SWAP_AMOUNT_ETH, 'ether')
     
     # Define the swap path for ETH -> USDC
     # Even for native ETH swaps, the path uses the WETH address as it represents
@@ -71,23 +107,32 @@ def swap_eth_for_usdc():
     print(f"Attempting to swap {w3.from_wei(amount_in, 'ether')} ETH for USDC...")
 
     try:
-        # Build the transaction
-        tx = uniswap_router.functions.swap(
-            path,
-            amount_in,
-            min_amount_out
-        ).build_transaction({
+        call = {
             'from': account.address,
+            'to': UNISWAP_V4_ROUTER_ADDRESS,
             'value': amount_in,
-            'gas': 300000,  # Increased gas limit for V4
-            'gasPrice': w3.eth.gas_price,
-            'nonce': w3.eth.get_transaction_count(account.address),
-            'chainId': 8453  # Base Mainnet Chain ID
-        })
+            'data': uniswap_router.encode_abi('swap', args=[path, amount_in, min_amount_out])
+        }
+
+        # Fee history, nonce and gas estimate in one round-trip; Base is EIP-1559, so no legacy gasPrice
+        with w3.batch_requests() as batch:
+            batch.add(w3.eth.fee_history(5, 'latest', [50]))
+            batch.add(w3.eth.get_transaction_count(account.address))
+            batch.add(w3.eth.estimate_gas(call))
+            fee_history, nonce, gas_estimate = batch.execute()
+
+        # Build the transaction
+        tx = {
+            **call,
+            'gas': gas_estimate * 6 // 5,  # 20% headroom over the estimate
+            'nonce': nonce,
+            'chainId': 8453,  # Base Mainnet Chain ID
+            **eip1559_fees(fee_history)
+        }
 
         # Sign and send the transaction
         signed_tx = w3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
         
         print(f"Transaction sent with hash: {tx_hash.hex()}")
         
@@ -105,8 +150,9 @@ def swap_eth_for_usdc():
         return
 
     print("-" * 50)
-    print(f"Final ETH Balance: {get_eth_balance():.6f} ETH")
-    print(f"Final USDC Balance: {get_usdc_balance():.6f} USDC")
+    eth_balance, usdc_balance = get_balances()
+    print(f"Final ETH Balance: {eth_balance:.6f} ETH")
+    print(f"Final USDC Balance: {usdc_balance:.6f} USDC")
     print("--- Swap Complete ---")
 
 